@@ -378,7 +378,7 @@ class ServiceHandler:
             try:
                 async with app.state.client.stream(
                     "POST", 
-                    f"http://localhost:{port}/v1/chat/completions", 
+                    f"http://127.0.0.1:{port}/v1/chat/completions", 
                     json=data,
                     timeout=STREAM_TIMEOUT
                 ) as response:
@@ -389,12 +389,13 @@ class ServiceHandler:
                         yield error_msg
                         return
                     
-                    async for chunk in response.aiter_bytes():
-                        buffer += chunk.decode('utf-8', errors='replace')
+                    # aiter_text decodes incrementally, so multi-byte characters split across chunks survive
+                    async for chunk in response.aiter_text():
+                        buffer += chunk
                         
-                        # Process complete lines
-                        while '\n' in buffer:
-                            line, buffer = buffer.split('\n', 1)
+                        # Process complete lines, splitting the buffer once per chunk
+                        *lines, buffer = buffer.split('\n')
+                        for line in lines:
                             json_str = _extract_json_data(line)
                             
                             if json_str is None:
@@ -484,7 +485,8 @@ class RequestProcessor:
         async with RequestProcessor.active_streams_lock:
             RequestProcessor.active_streams.add(stream_id)
             RequestProcessor.stream_timestamps[stream_id] = time.time()
-            logger.debug(f"Registered active stream {stream_id}, total active: {len(RequestProcessor.active_streams)}")
+            active_count = len(RequestProcessor.active_streams)
+        logger.debug(f"Registered active stream {stream_id}, total active: {active_count}")
     
     @staticmethod
     async def unregister_stream(stream_id: str):
@@ -492,13 +494,14 @@ class RequestProcessor:
         async with RequestProcessor.active_streams_lock:
             RequestProcessor.active_streams.discard(stream_id)
             RequestProcessor.stream_timestamps.pop(stream_id, None)
-            logger.debug(f"Unregistered stream {stream_id}, total active: {len(RequestProcessor.active_streams)}")
+            active_count = len(RequestProcessor.active_streams)
+        logger.debug(f"Unregistered stream {stream_id}, total active: {active_count}")
     
     @staticmethod
     async def has_active_streams() -> bool:
         """Check if there are any active streams."""
-        async with RequestProcessor.active_streams_lock:
-            return len(RequestProcessor.active_streams) > 0
+        # Reading the set size is atomic on the event loop thread, no lock needed
+        return len(RequestProcessor.active_streams) > 0
     
     @staticmethod
     async def terminate_active_streams():
@@ -507,7 +510,7 @@ class RequestProcessor:
             terminated_count = len(RequestProcessor.active_streams)
             RequestProcessor.active_streams.clear()
             RequestProcessor.stream_timestamps.clear()
-            logger.warning(f"Force terminated {terminated_count} active streams")
+        logger.warning(f"Force terminated {terminated_count} active streams")
     
     @staticmethod
     async def wait_for_streams_to_complete(timeout: float = MODEL_SWITCH_STREAM_TIMEOUT, force_terminate: bool = False):
@@ -533,7 +536,7 @@ class RequestProcessor:
                     # Log the active stream IDs for debugging
                     async with RequestProcessor.active_streams_lock:
                         active_stream_ids = list(RequestProcessor.active_streams)
-                        logger.warning(f"Force terminating stream IDs: {active_stream_ids}")
+                    logger.warning(f"Force terminating stream IDs: {active_stream_ids}")
                     
                     await RequestProcessor.terminate_active_streams()
                     break
@@ -543,7 +546,7 @@ class RequestProcessor:
                     # Log the active stream IDs for debugging
                     async with RequestProcessor.active_streams_lock:
                         active_stream_ids = list(RequestProcessor.active_streams)
-                        logger.error(f"Active stream IDs: {active_stream_ids}")
+                    logger.error(f"Active stream IDs: {active_stream_ids}")
                     return False
             
             # Log progress every 5 seconds
@@ -579,12 +582,15 @@ class RequestProcessor:
             for stream_id in stale_streams:
                 RequestProcessor.active_streams.discard(stream_id)
                 RequestProcessor.stream_timestamps.pop(stream_id, None)
-                logger.warning(f"Cleaned up stale stream {stream_id}")
-            
-            if stale_streams:
-                logger.warning(f"Cleaned up {len(stale_streams)} stale streams")
-            elif RequestProcessor.active_streams:
-                logger.info(f"No stale streams found, {len(RequestProcessor.active_streams)} active streams are healthy")
+            active_count = len(RequestProcessor.active_streams)
+        
+        # Log after releasing the lock so slow sinks don't stall stream registration
+        for stream_id in stale_streams:
+            logger.warning(f"Cleaned up stale stream {stream_id}")
+        if stale_streams:
+            logger.warning(f"Cleaned up {len(stale_streams)} stale streams")
+        elif active_count:
+            logger.info(f"No stale streams found, {active_count} active streams are healthy")
     
     @staticmethod
     async def _add_to_queue_with_backpressure(item, timeout: float = QUEUE_BACKPRESSURE_TIMEOUT):
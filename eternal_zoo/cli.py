@@ -4,7 +4,6 @@ import asyncio
 import argparse
 import json
 import yaml
-import random
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
@@ -12,7 +11,7 @@ from rich import print as rprint
 
 from eternal_zoo.version import __version__
 from eternal_zoo.config import DEFAULT_CONFIG
-from eternal_zoo.utils import find_gguf_files
+from eternal_zoo.utils import find_gguf_files, write_json_atomic
 from eternal_zoo.manager import EternalZooManager
 from eternal_zoo.upload import upload_folder_to_lighthouse
 from eternal_zoo.constants import DEFAULT_MODEL_DIR, POSTFIX_MODEL_PATH
@@ -41,6 +40,33 @@ def get_all_downloaded_models() -> list:
 
     return downloaded_models
 
+def install_event_loop_policy():
+    """Use uvloop for the CLI's asyncio.run calls when enabled and installed."""
+    if not DEFAULT_CONFIG.performance.FAST_EVENT_LOOP or sys.platform == "win32":
+        return
+    try:
+        import uvloop
+    except ImportError:
+        print_warning("CRYPTO_FAST_EVENT_LOOP is set but uvloop is not installed, using the default event loop")
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+async def download_with_metadata_async(hf_data: dict, filecoin_hash: str):
+    """
+    Download a model, then load its gateway metadata on the same event loop.
+
+    Downloading by hash fetches the metadata first and caches it as {hash}.json,
+    so the follow-up fetch is a local read, not a second round of gateway requests.
+    """
+    success, local_path = await download_model_async(hf_data, filecoin_hash)
+    if not success:
+        return (success, local_path), (False, None)
+    try:
+        metadata_result = await fetch_model_metadata_async(filecoin_hash)
+    except Exception:
+        metadata_result = (False, None)
+    return (success, local_path), metadata_result
+
 def print_banner():
     """Display a beautiful banner for the CLI"""
     console = Console()
@@ -506,15 +532,12 @@ def handle_download(args) -> bool:
             sys.exit(1)
         model_name = HASH_TO_MODEL[args.hash]
         hf_data = FEATURED_MODELS[model_name]
-        success, local_path = asyncio.run(download_model_async(hf_data, args.hash))
+        # Load the gateway metadata cached by the download to enrich the saved file
+        (success, local_path), (meta_success, fetched_meta) = asyncio.run(
+            download_with_metadata_async(hf_data, args.hash)
+        )
         # Prepare and persist model metadata JSON (merge with fetched metadata if exists)
         if success:
-            try:
-                # Try to fetch gateway metadata to enrich saved file
-                meta_success, fetched_meta = asyncio.run(fetch_model_metadata_async(args.hash))
-            except Exception:
-                meta_success, fetched_meta = False, None
-
             projector_path = f"{local_path}-projector"
             model_metadata_path = os.path.join(DEFAULT_MODEL_DIR, f"{args.hash}.json")
             existing_meta = {}
@@ -542,8 +565,7 @@ def handle_download(args) -> bool:
                 "hf_data": hf_data
             }
             merged = {**(fetched_meta or {}), **existing_meta, **updates}
-            with open(model_metadata_path, "w") as f:
-                json.dump(merged, f)
+            write_json_atomic(model_metadata_path, merged)
     elif args.model_name:
         if args.model_name in MODEL_TO_HASH:
             args.hash = MODEL_TO_HASH[args.model_name]
@@ -551,7 +573,16 @@ def handle_download(args) -> bool:
             print_error(f"Model name {args.model_name} not found in FEATURED_MODELS")
             sys.exit(1)
         hf_data = FEATURED_MODELS[args.model_name]
-        success, local_path = asyncio.run(download_model_async(hf_data, args.hash))
+        fetched_meta = None
+        if getattr(args, 'hash', None):
+            # Enrich with the gateway metadata cached by the download
+            (success, local_path), (meta_success, fetched_meta) = asyncio.run(
+                download_with_metadata_async(hf_data, args.hash)
+            )
+            if not meta_success:
+                fetched_meta = None
+        else:
+            success, local_path = asyncio.run(download_model_async(hf_data, args.hash))
         # Save metadata for named featured models
         if success:
             projector_path = f"{local_path}-projector"
@@ -565,16 +596,6 @@ def handle_download(args) -> bool:
                 except Exception:
                     existing_meta = {}
 
-            # Enrich with gateway metadata if we have a hash
-            fetched_meta = None
-            if getattr(args, 'hash', None):
-                try:
-                    meta_success, fetched_meta = asyncio.run(fetch_model_metadata_async(args.hash))
-                    if not meta_success:
-                        fetched_meta = None
-                except Exception:
-                    fetched_meta = None
-
             updates = {
                 "task": (existing_meta.get("task")
                           or (fetched_meta or {}).get("task")
@@ -592,8 +613,7 @@ def handle_download(args) -> bool:
                 "hf_data": hf_data
             }
             merged = {**(fetched_meta or {}), **existing_meta, **updates}
-            with open(model_metadata_path, "w") as f:
-                json.dump(merged, f)
+            write_json_atomic(model_metadata_path, merged)
     else:
         # Download from Hugging Face
         hf_data = {
@@ -636,8 +656,7 @@ def handle_download(args) -> bool:
                 "hf_data": hf_data
             }
             model_metadata_path = os.path.join(DEFAULT_MODEL_DIR, f"{model_id}.json")
-            with open(model_metadata_path, "w") as f:
-                json.dump(model_metadata, f)
+            write_json_atomic(model_metadata_path, model_metadata)
     
     # Handle download result
     if success:
@@ -1164,6 +1183,7 @@ def main():
     print_banner()
 
     known_args, unknown_args = parse_args()
+    install_event_loop_policy()
 
     # Handle unknown arguments
     if unknown_args:
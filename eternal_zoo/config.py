@@ -61,6 +61,9 @@ class PerformanceConfig:
     # Streaming
     STREAM_CHUNK_SIZE: int = int(os.getenv("CRYPTO_STREAM_CHUNK_SIZE", "16384"))  # 16KB
 
+    # Event loop
+    FAST_EVENT_LOOP: bool = os.getenv("CRYPTO_FAST_EVENT_LOOP", "false").lower() in ("1", "true", "yes")  # use uvloop when installed
+
 
 class CoreConfig:
     """Core service configuration settings."""
@@ -1,19 +1,24 @@
 import os
 import json
+import math
 import random
 import aiohttp
 import asyncio
-import hashlib
-import subprocess
 from pathlib import Path
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from loguru import logger
 from huggingface_hub import HfApi
-from eternal_zoo.utils import async_move, async_rmtree, compute_file_hash
+from eternal_zoo.utils import async_move, async_rmtree, compute_file_hash, write_json_atomic
 from eternal_zoo.models import FEATURED_MODELS, HASH_TO_MODEL
 from eternal_zoo.constants import DEFAULT_MODEL_DIR, POSTFIX_MODEL_PATH, GATEWAY_URLS, ETERNAL_AI_METADATA_GW, PREFIX_DOWNLOAD_LOG
 
 SLEEP_TIME = 2
-CONNECTION_POOL_SIZE = 32  # Increased connection pool
+MAX_BACKOFF = 30  # Cap on the retry delay in seconds
+GATEWAY_FAILOVER_STATUSES = (401, 403, 404)  # Gateway responses that retrying will not change
+MAX_HASH_WORKERS = 4  # Files verified in parallel
+HASH_SIDECAR_DIR = os.path.join(".cache", "eternal_zoo", "sha256")  # Relative to the download folder
 
 hf_api = HfApi(
     token = os.getenv("HF_TOKEN")
@@ -44,36 +49,93 @@ def get_infos_from_paths(repo_id: str, paths: list[str]) -> dict:
         }
     return infos
 
+def verify_file_hash(infos: dict, file_name: str, folder_path: str) -> bool:
+    """
+    Verify a file downloaded into folder_path against the sha256 in the infos.
+    Files that already passed verification are not re-read on later retries, and a
+    `.sha256` sidecar lets later runs skip re-hashing a file as long as it has not
+    been modified since. Sidecars live under the folder's `.cache` directory, next
+    to hf's own bookkeeping, so they never show up among the model files.
+    """
+    file_info = infos["files"][file_name]
+    if file_info.get("verified"):
+        return True
+
+    expected_hash = file_info["sha256"]
+    file_path = os.path.join(folder_path, file_name)
+    sidecar_path = Path(folder_path, HASH_SIDECAR_DIR, f"{file_name}.sha256")
+    try:
+        if (sidecar_path.stat().st_mtime >= os.path.getmtime(file_path)
+                and sidecar_path.read_text().strip() == expected_hash):
+            file_info["verified"] = True
+            return True
+    except OSError:
+        # Missing or unreadable sidecar, fall back to hashing the file
+        pass
+
+    if compute_file_hash(file_path) != expected_hash:
+        return False
+    file_info["verified"] = True
+    try:
+        sidecar_path.parent.mkdir(parents=True, exist_ok=True)
+        sidecar_path.write_text(expected_hash + "\n")
+    except OSError as e:
+        logger.warning(f"Failed to write hash sidecar {sidecar_path}: {e}")
+    return True
+
 def check_valid_folder(infos: dict, folder_path: str) -> bool:
     """
     Check if the folder is valid by comparing the sha256 of the files in the folder with the sha256 in the infos.
+    Files are hashed concurrently since hashlib releases the GIL while hashing.
     """
+    pending = {}
     for file_name, file_info in infos["files"].items():
         if file_info["sha256"] is None:
             continue
         file_path = os.path.join(folder_path, file_name)
         if not os.path.exists(file_path):
             return False, infos
-        computed_sha256 = compute_file_hash(file_path)
-        if computed_sha256 != file_info["sha256"]:
-            # remove invalid file
-            try:
-                os.remove(file_path)
-                infos["files"].pop(file_name)
-            except Exception as e:
-                logger.error(f"Failed to remove invalid file {file_path}: {e}")
-            return False, infos
-        logger.info(f"File {file_name} is valid")
-    return True, infos
+        pending[file_name] = file_path
+
+    if not pending:
+        return True, infos
+
+    # Largest files first, so a big shard never ends up hashing alone after the small ones finish
+    ordered = sorted(pending, key=lambda name: infos["files"][name].get("size") or 0, reverse=True)
+
+    invalid_files = []
+    with ThreadPoolExecutor(max_workers=min(MAX_HASH_WORKERS, len(pending))) as executor:
+        futures = {
+            executor.submit(verify_file_hash, infos, file_name, folder_path): file_name
+            for file_name in ordered
+        }
+        for future in as_completed(futures):
+            file_name = futures[future]
+            if future.result():
+                logger.info(f"File {file_name} is valid")
+            else:
+                invalid_files.append(file_name)
+
+    for file_name in invalid_files:
+        # remove invalid file, keeping its entry so the re-downloaded copy is verified again
+        file_path = pending[file_name]
+        infos["files"][file_name].pop("verified", None)
+        try:
+            os.remove(file_path)
+        except Exception as e:
+            logger.error(f"Failed to remove invalid file {file_path}: {e}")
+    return not invalid_files, infos
 
 
-async def pick_fastest_gateway(filecoin_hash: str, gateways: list[str], timeout: int = 5) -> str:
+async def pick_fastest_gateway(filecoin_hash: str, gateways: list[str], session: aiohttp.ClientSession, timeout: int = 5) -> str:
     """
     Check the speed of each gateway and return the fastest one for the given filecoin_hash.
     If only one gateway is provided, return it immediately.
     Args:
         filecoin_hash (str): The IPFS hash to test download speed for.
         gateways (list[str]): List of gateway URLs.
+        session (aiohttp.ClientSession): Session to probe with, so the caller can reuse
+            the warm connection to the chosen gateway.
         timeout (int): Timeout in seconds for each speed test.
     Returns:
         str: The fastest gateway URL, or the first in the list if all fail.
@@ -85,42 +147,75 @@ async def pick_fastest_gateway(filecoin_hash: str, gateways: list[str], timeout:
         return gateways[0]
 
     logger.info(f"[pick_fastest_gateway] 🚦 Checking speed for {len(gateways)} gateways with hash: {filecoin_hash}")
+    probe_timeout = aiohttp.ClientTimeout(total=timeout)
 
-    async def check_gateway(gateway: str) -> tuple[str, float]:
+    async def check_gateway(session: aiohttp.ClientSession, gateway: str) -> tuple[str, float]:
         url = f"{gateway}{filecoin_hash}"
         logger.info(f"[pick_fastest_gateway] 🔍 Testing gateway: {url}")
         start = asyncio.get_event_loop().time()
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
-                # Use GET with Range header to fetch only the first 1KB, since some gateways may not support HEAD
-                headers = {"Range": "bytes=0-1023"}
-                async with session.get(url, headers=headers) as resp:
-                    if resp.status in (200, 206):  # 206 = Partial Content
-                        elapsed = asyncio.get_event_loop().time() - start
-                        logger.info(f"[pick_fastest_gateway] ⏱️ Gateway {gateway} responded in {elapsed:.3f} seconds.")
-                        return gateway, elapsed
-                    else:
-                        logger.warning(f"[pick_fastest_gateway] ⚠️ Gateway {gateway} returned status {resp.status}.")
+            # Use GET with Range header to fetch only the first 1KB, since some gateways may not support HEAD
+            headers = {"Range": "bytes=0-1023"}
+            async with session.get(url, headers=headers, timeout=probe_timeout) as resp:
+                if resp.status in (200, 206):  # 206 = Partial Content
+                    elapsed = asyncio.get_event_loop().time() - start
+                    logger.info(f"[pick_fastest_gateway] ⏱️ Gateway {gateway} responded in {elapsed:.3f} seconds.")
+                    return gateway, elapsed
+                else:
+                    logger.warning(f"[pick_fastest_gateway] ⚠️ Gateway {gateway} returned status {resp.status}.")
         except Exception as e:
             logger.warning(f"[pick_fastest_gateway] ❌ Error with gateway {gateway}: {e}")
         # Return infinity if the gateway is not available or too slow
         return gateway, float('inf')
 
-    # Run all gateway checks concurrently
-    tasks = [check_gateway(gw) for gw in gateways]
-    results = await asyncio.gather(*tasks)
-    # Filter for gateways that responded successfully
-    valid_results = [r for r in results if r[1] != float('inf')]
-    if valid_results:
-        fastest = min(valid_results, key=lambda x: x[1])
-        logger.info(f"[pick_fastest_gateway] 🚀 Fastest gateway selected: {fastest[0]} (time: {fastest[1]:.3f} seconds)\n")
-        return fastest[0]
-    else:
-        logger.warning(f"[pick_fastest_gateway] ⚠️ All gateways timed out or failed. Using the first gateway as fallback: {gateways[0]}")
-        return gateways[0]
+    async def probe_gateways(session: aiohttp.ClientSession) -> str | None:
+        # Run all gateway checks concurrently; the first successful response is the fastest,
+        # so return it right away instead of waiting for slower gateways to finish or time out
+        pending = {asyncio.create_task(check_gateway(session, gw)) for gw in gateways}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Filter for gateways that responded successfully
+                valid_results = [task.result() for task in done if task.result()[1] != float('inf')]
+                if valid_results:
+                    fastest = min(valid_results, key=lambda x: x[1])
+                    logger.info(f"[pick_fastest_gateway] 🚀 Fastest gateway selected: {fastest[0]} (time: {fastest[1]:.3f} seconds)\n")
+                    return fastest[0]
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return None
+
+    fastest = await probe_gateways(session)
+    if fastest is not None:
+        return fastest
+
+    logger.warning(f"[pick_fastest_gateway] ⚠️ All gateways timed out or failed. Using the first gateway as fallback: {gateways[0]}")
+    return gateways[0]
     
-def calculate_backoff(attempt: int) -> int:
-    return min(SLEEP_TIME * (2 ** (attempt - 1)), 300)
+def calculate_backoff(attempt: int) -> float:
+    # Jitter keeps concurrent retries from hitting a recovering gateway in lockstep
+    return round(min(SLEEP_TIME * (2 ** (attempt - 1)), MAX_BACKOFF) + random.uniform(0, 1), 1)
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header given in seconds or as an HTTP date, or None if absent or invalid."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        # Rejects "inf", "nan" and negative delays
+        return seconds if math.isfinite(seconds) and seconds >= 0 else None
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
     
 
 async def fetch_model_metadata_async(filecoin_hash: str) -> tuple[bool, dict | None]:
@@ -138,30 +233,52 @@ async def fetch_model_metadata_async(filecoin_hash: str) -> tuple[bool, dict | N
         with open(metadata_path, "r") as f:
             return True, json.load(f)
     
-    # Select the fastest gateway before downloading
-    logger.info("Checking gateway speeds...")
     # for meta-data add more with ETERNAL_AI_METADATA_GW
     gateways_with_eternal = GATEWAY_URLS + [ETERNAL_AI_METADATA_GW]
-    best_gateway = await pick_fastest_gateway(filecoin_hash, gateways_with_eternal)
-    logger.info(f"Using fastest gateway: {best_gateway}")
-    input_link = f"{best_gateway}{filecoin_hash}"
 
-    # Set up session parameters with optimized limits
+    # Set up session parameters; at most one probe runs per gateway and the
+    # metadata requests go to one gateway at a time, so one connection per host is enough
     timeout = aiohttp.ClientTimeout(total=180, connect=60)
-    connector = aiohttp.TCPConnector(limit=CONNECTION_POOL_SIZE)
-
-    # Use infinite retry loop with exponential backoff
-    attempt = 1
-    while True:  # Infinite loop until success or user cancellation
-        backoff = calculate_backoff(attempt)
+    connector = aiohttp.TCPConnector(limit=len(gateways_with_eternal), limit_per_host=1)
+
+    # One session for the gateway probe and every retry, so the connection to the
+    # chosen gateway stays warm and the connector is not closed between attempts
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        # Select the fastest gateway before downloading
+        logger.info("Checking gateway speeds...")
+        best_gateway = await pick_fastest_gateway(filecoin_hash, gateways_with_eternal, session=session)
+        logger.info(f"Using fastest gateway: {best_gateway}")
+        input_link = f"{best_gateway}{filecoin_hash}"
+
+        # Use infinite retry loop with exponential backoff
+        attempt = 1
+        while True:  # Infinite loop until success or user cancellation
+            backoff = calculate_backoff(attempt)
 
-        try:
-            logger.info(f"Downloading model metadata (attempt {attempt})")
+            try:
+                logger.info(f"Downloading model metadata (attempt {attempt})")
 
-            async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
                 async with session.get(input_link) as response:
+                    if response.status in GATEWAY_FAILOVER_STATUSES:
+                        # The gateway won't serve this hash however often we ask; switch without sleeping
+                        logger.warning(f"Gateway {best_gateway} rejected metadata request: HTTP {response.status}")
+                        gateways_with_eternal = [gw for gw in gateways_with_eternal if gw != best_gateway]
+                        if not gateways_with_eternal:
+                            logger.error("No gateways left to fetch model metadata from")
+                            return False, None
+                        best_gateway = await pick_fastest_gateway(filecoin_hash, gateways_with_eternal, session=session)
+                        logger.info(f"Using fastest gateway: {best_gateway}")
+                        input_link = f"{best_gateway}{filecoin_hash}"
+                        attempt += 1
+                        continue
+
                     if response.status != 200:
                         logger.warning(f"Failed to fetch metadata: HTTP {response.status}")
+                        if response.status in (408, 429):
+                            # Rate limited or timed out: the gateway is healthy, wait as long as it asks
+                            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                            if retry_after is not None:
+                                backoff = min(retry_after, MAX_BACKOFF)
                         logger.warning(f"Retrying in {backoff} seconds")
                         await asyncio.sleep(backoff)
                         attempt += 1
@@ -170,25 +287,24 @@ async def fetch_model_metadata_async(filecoin_hash: str) -> tuple[bool, dict | N
                     # Parse metadata
                     data = await response.json()
                     data["filecoin_hash"] = filecoin_hash
-                    with open(metadata_path, "w") as f:
-                        json.dump(data, f)
+                    write_json_atomic(metadata_path, data)
                     return True, data
 
-        except KeyboardInterrupt:
-            logger.info("Metadata download canceled by user")
-            return False, None
-        except aiohttp.ClientError as e:
-            logger.warning(f"HTTP error on attempt {attempt}: {e}")
-            logger.warning(f"Retrying in {backoff} seconds")
-            await asyncio.sleep(backoff)
-            attempt += 1
-            continue
-        except Exception as e:
-            logger.warning(f"Download attempt {attempt} failed: {e}")
-            logger.warning(f"Retrying in {backoff} seconds")
-            await asyncio.sleep(backoff)
-            attempt += 1
-            continue
+            except KeyboardInterrupt:
+                logger.info("Metadata download canceled by user")
+                return False, None
+            except aiohttp.ClientError as e:
+                logger.warning(f"HTTP error on attempt {attempt}: {e}")
+                logger.warning(f"Retrying in {backoff} seconds")
+                await asyncio.sleep(backoff)
+                attempt += 1
+                continue
+            except Exception as e:
+                logger.warning(f"Download attempt {attempt} failed: {e}")
+                logger.warning(f"Retrying in {backoff} seconds")
+                await asyncio.sleep(backoff)
+                attempt += 1
+                continue
 
 async def download_model_async_by_hash(hf_data: dict, filecoin_hash: str) -> tuple[bool, str | None]:
     """
@@ -350,21 +466,21 @@ class HuggingFaceProgressTracker:
             "percentage": self.percentage
         }
     
+def get_folder_disk_usage(folder_path: str) -> int:
+    """Return the disk usage of a folder in bytes, counting allocated blocks like `du -s`."""
+    total = 0
+    for root, _, files in os.walk(folder_path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_blocks * 512
+            except OSError:
+                # File was moved or removed while walking
+                continue
+    return total
+
 async def calculate_current_size_of_folder(folder_path: str) -> int:
-    process = await asyncio.create_subprocess_shell(
-        f"du -s {folder_path}",
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    stdout, stderr = await process.communicate()
-
-    if process.returncode == 0:
-        size_str = stdout.decode().split()[0]
-        current_size = int(size_str) * 1024
-        return current_size
-    else:
-        logger.warning(f"Failed to get directory size: {stderr.decode()}")
-        return 0
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, get_folder_disk_usage, folder_path)
 
 async def track_progress(tracker: HuggingFaceProgressTracker, folder_path: str):
     """Periodically track the size of tmp_dir and update the tracker.
@@ -385,6 +501,24 @@ async def track_progress(tracker: HuggingFaceProgressTracker, folder_path: str):
             logger.warning(f"Error in progress tracking: {e}")
         await asyncio.sleep(2)  # Check every 2 second 
 
+async def run_hf_download(*args: str) -> int:
+    """Run `hf download` with the given arguments, killing it if the download is cancelled.
+
+    Args:
+        *args: Arguments passed after `hf download`.
+
+    Returns:
+        int: The exit code of the command.
+    """
+    process = await asyncio.create_subprocess_exec("hf", "download", *args)
+    try:
+        return await process.wait()
+    except asyncio.CancelledError:
+        # Don't leave the download running in the background after cancellation
+        process.kill()
+        await process.wait()
+        raise
+
 async def download_model_from_hf(data: dict, final_dir: str | None = None) -> tuple[bool, dict | None]:
     """
     Download model from HuggingFace Hub with infinite retry logic and exponential backoff.
@@ -460,7 +594,7 @@ async def download_model_from_hf(data: dict, final_dir: str | None = None) -> tu
             try:
                 logger.info(f"Download attempt {attempt} for {repo_id}")
                             
-                # Run the synchronous download in a thread executor to avoid blocking
+                # Hash verification is blocking, run it in a thread executor
                 loop = asyncio.get_event_loop()
                 
                 if model is None:
@@ -471,15 +605,10 @@ async def download_model_from_hf(data: dict, final_dir: str | None = None) -> tu
                             return True, {"model_path": final_path, "tmp_dir": tmp_dir}
 
                     if pattern:                        
-                        command = f"hf download {repo_id} --local-dir {tmp_dir} --include \"*{pattern}*\""
-
-                        await loop.run_in_executor(
-                            None,
-                            lambda: subprocess.run(command, shell=True)
-                        )
+                        await run_hf_download(repo_id, "--local-dir", tmp_dir, "--include", f"*{pattern}*")
                         
                         res["model_path"] = tmp_dir
-                        valid, infos = check_valid_folder(infos, tmp_dir)
+                        valid, infos = await loop.run_in_executor(None, check_valid_folder, infos, tmp_dir)
                         if not valid:
                             continue
 
@@ -488,14 +617,10 @@ async def download_model_from_hf(data: dict, final_dir: str | None = None) -> tu
                             res["model_path"] = final_path
                                                    
                     else:
-                        command = f"hf download {repo_id} --local-dir {tmp_dir}"
-                        await loop.run_in_executor(
-                            None,
-                            lambda: subprocess.run(command, shell=True)
-                        )
+                        await run_hf_download(repo_id, "--local-dir", tmp_dir)
 
                         res["model_path"] = tmp_dir
-                        valid, infos = check_valid_folder(infos, tmp_dir)
+                        valid, infos = await loop.run_in_executor(None, check_valid_folder, infos, tmp_dir)
                         if not valid:
                             continue
                         
@@ -523,32 +648,32 @@ async def download_model_from_hf(data: dict, final_dir: str | None = None) -> tu
                 if skip_download_model and skip_download_projector:
                     return True, res
 
+                model_check = None
                 if not skip_download_model:
-                    command = f"hf download {repo_id} {model} --local-dir {tmp_dir}"
-                    await loop.run_in_executor(
-                        None,
-                        lambda: subprocess.run(command, shell=True)
-                    )
+                    await run_hf_download(repo_id, model, "--local-dir", tmp_dir)
                     res["model_path"] = os.path.join(tmp_dir, model)
-
-                if projector:
-                    if final_projector_path:
-                        if os.path.exists(final_projector_path):
-                            skip_download_projector = True
-                            res["projector_path"] = final_projector_path
-                            logger.info(f"Projector {final_projector_path} already exists")
-                            
-                    if not skip_download_projector:
-                        command = f"hf download {repo_id} {projector} --local-dir {tmp_dir}"
-                        await loop.run_in_executor(
-                            None,
-                            lambda: subprocess.run(command, shell=True)
-                        )
-                        res["projector_path"] = os.path.join(tmp_dir, projector)
+                    # Verify the model in the background while the projector downloads
+                    model_check = loop.run_in_executor(None, verify_file_hash, infos, model, tmp_dir)
+
+                try:
+                    if projector:
+                        if final_projector_path:
+                            if os.path.exists(final_projector_path):
+                                skip_download_projector = True
+                                res["projector_path"] = final_projector_path
+                                logger.info(f"Projector {final_projector_path} already exists")
+                                
+                        if not skip_download_projector:
+                            await run_hf_download(repo_id, projector, "--local-dir", tmp_dir)
+                            res["projector_path"] = os.path.join(tmp_dir, projector)
+                finally:
+                    if model_check is not None:
+                        # Even if the projector step fails or is cancelled, don't leave this attempt
+                        # while a thread is still hashing the model file a retry may rewrite
+                        await asyncio.gather(model_check, return_exceptions=True)
                 
-                if not skip_download_model:
-                    sha256_model = compute_file_hash(res["model_path"])
-                    if sha256_model != infos["files"][model]["sha256"]:
+                if model_check is not None:
+                    if not await model_check:
                         # remove the invalid file
                         os.remove(res["model_path"])
                         logger.warning(f"Model {res['model_path']} is invalid, removing it")
@@ -558,8 +683,7 @@ async def download_model_from_hf(data: dict, final_dir: str | None = None) -> tu
                 
                 if projector:
                     if not skip_download_projector:
-                        sha256_projector = compute_file_hash(res["projector_path"])
-                        if sha256_projector != infos["files"][projector]["sha256"]:
+                        if not await loop.run_in_executor(None, verify_file_hash, infos, projector, tmp_dir):
                             # remove the invalid file
                             os.remove(res["projector_path"])
                             logger.warning(f"Projector {res['projector_path']} is invalid, removing it")
@@ -1,18 +1,24 @@
 import os
 import json
+import errno
 import time
 import shutil
 import signal
 import msgpack
 import psutil
 import asyncio
+import select
 import socket
+import tempfile
 import subprocess
-import pkg_resources
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+from importlib.resources import files
 from loguru import logger
 from eternal_zoo.config import DEFAULT_CONFIG
-from eternal_zoo.utils import wait_for_health
+from eternal_zoo.utils import wait_for_health, wait_for_health_async
 from typing import Optional, Dict, Any, List
 
 class EternalZooServiceError(Exception):
@@ -27,6 +33,132 @@ class ModelNotFoundError(EternalZooServiceError):
     """Exception raised when model file is not found."""
     pass
 
+# llama-server flags shared by every chat model launch
+LLAMA_CHAT_CONST_ARGS = (
+    "--pooling", "mean",
+    "--no-webui",
+    "--no-context-shift",
+    "-fa",
+    "-ngl", "9999",
+    "--embeddings",
+    "--jinja",
+)
+
+# llama-server flags shared by every embedding model launch
+LLAMA_EMBED_CONST_ARGS = (
+    "--embedding",
+    "--pooling", "mean",
+    "-ub", "4096",
+    "-ngl", "9999",
+)
+
+# Model name keywords -> family, checked in order so more specific names win
+MODEL_FAMILY_PATTERNS = (
+    (("gpt-oss",), "gpt-oss"),
+    (("jan-v1",), "jan-v1"),
+    (("qwen3-coder",), "qwen3-coder"),
+    (("qwen3", "2507"), "qwen3-2507"),
+    (("qwen3",), "qwen3"),
+    (("qwen2.5",), "qwen2.5"),
+    (("lfm2",), "lfm2"),
+    (("openreasoning-nemotron",), "openreasoning-nemotron"),
+    (("dolphin-3.0",), "dolphin-3.0"),
+    (("dolphin-3.1",), "dolphin-3.1"),
+    (("devstral-small",), "devstral-small"),
+    (("gemma-3n",), "gemma-3n"),
+    (("gemma-3",), "gemma-3"),
+)
+
+def _read_msgpack(path: Path):
+    """Read a msgpack file with a single read() and unpack it in one call."""
+    with open(path, "rb") as f:
+        return msgpack.unpackb(f.read())
+
+def _write_msgpack(path: Path, data) -> None:
+    """
+    Atomically write data as msgpack, so a crash mid-write never leaves a truncated file.
+
+    Each call gets its own temp file, so the CLI and the API server writing the same
+    service file can't replace it with each other's partial data.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(msgpack.packb(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+@lru_cache(maxsize=64)
+def _find_package_file(relative_path: str) -> str | None:
+    """Resolve a data file shipped with eternal_zoo, or None if it does not exist.
+
+    Packaged files don't change while the process runs, so lookups are cached.
+    """
+    resource = files("eternal_zoo").joinpath(relative_path)
+    if not resource.is_file():
+        return None
+    return str(resource)
+
+@lru_cache(maxsize=16)
+def _load_best_practice(path: str, mtime_ns: int) -> tuple:
+    """Parse a best practice file into ready-made "--key value" arguments, cached per path and modification time."""
+    with open(path, "r") as f:
+        return tuple(chain.from_iterable((f"--{key}", str(value)) for key, value in json.load(f).items()))
+
+def _best_practice_args(path: str | None) -> tuple:
+    """Best practice arguments for path, or none if there is no best practice file (any more)."""
+    if path is None:
+        return ()
+    try:
+        # The stat doubles as the existence check, so the hit path costs a single syscall
+        return _load_best_practice(path, os.stat(path).st_mtime_ns)
+    except FileNotFoundError:
+        return ()
+
+def _wait_for_pid_exit(pid: int, timeout: float) -> bool:
+    """
+    Wait up to timeout seconds for a process to exit (a zombie counts as exited).
+
+    On Linux a pidfd becomes readable the moment the process exits, so the wait
+    is a single poll() instead of repeatedly polling /proc. poll() rather than
+    select(), since in the API process the pidfd can be numbered past FD_SETSIZE.
+    """
+    if hasattr(os, "pidfd_open"):
+        try:
+            pidfd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pidfd = None
+        if pidfd is not None:
+            try:
+                poller = select.poll()
+                poller.register(pidfd, select.POLLIN)
+                return bool(poller.poll(max(timeout, 0) * 1000))
+            finally:
+                os.close(pidfd)
+
+    deadline = time.monotonic() + timeout
+    wait_time = 0.1
+    while True:
+        try:
+            if psutil.Process(pid).status() == psutil.STATUS_ZOMBIE:
+                return True
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(wait_time, remaining))
+        wait_time = min(wait_time * 1.5, 2.0)  # Cap at 2 seconds
+
 class EternalZooManager:
     """Manages an EternalZoo service with optimized performance."""
     
@@ -49,6 +181,15 @@ class EternalZooManager:
         self.logs_dir.mkdir(exist_ok=True)
         self.ai_log_file = self.logs_dir / "ai.log"
         self.api_log_file = self.logs_dir / "api.log"
+
+        # Raw service info bytes keyed by (inode, mtime_ns, size) of the file they were read from
+        self._service_info_cache: tuple[tuple[int, int, int], bytes] | None = None
+
+        # Template and best practice paths for every known family, resolved once
+        self._family_paths = {
+            family: (self._get_model_template_path(family), self._get_model_best_practice_path(family))
+            for _, family in MODEL_FAMILY_PATTERNS
+        }
         
     def _get_free_port(self) -> int:
         """Get a free port number."""
@@ -58,20 +199,57 @@ class EternalZooManager:
 
     def _get_family_template_and_practice(self, model_family: str):
         """Helper to get template and best practice paths based on folder name."""
-        return (
-            self._get_model_template_path(model_family),
-            self._get_model_best_practice_path(model_family)
-        )
+        return self._family_paths.get(model_family, (None, None))
 
-    def _check_port_availability(self, host: str, port: int) -> bool:
-        """Check if a port is available on the given host."""
+    def _new_port_probe(self) -> socket.socket:
+        """Create a socket for bind probes."""
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Match uvicorn, which also sets SO_REUSEADDR, so lingering TIME_WAIT sockets don't count as in use
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        return s
+
+    def _check_port_availability(self, host: str, port: int, probe: socket.socket | None = None) -> bool:
+        """
+        Check if a port is available on the given host by trying to bind it.
+
+        Returns False only when the port is in use; any other bind failure (an address
+        that isn't local, a privileged port) can't be fixed by waiting and is raised.
+        A failed bind leaves the socket unbound, so callers that retry can pass the
+        same probe every time instead of allocating a new socket per attempt.
+        """
+        if probe is None:
+            with self._new_port_probe() as s:
+                return self._check_port_availability(host, port, s)
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(1)
-                result = s.connect_ex((host, port))
-                return result != 0  # Port is available if connection fails
+            probe.bind((host, port))
+            return True
+        except OSError as e:
+            if e.errno == errno.EADDRINUSE:
+                return False
+            raise ServiceStartError(f"Cannot bind {host}:{port}: {e.strerror or e}")
+
+    def _is_own_api_port(self, port: int) -> bool:
+        """Check if port belongs to our recorded API service and that service is still running."""
+        try:
+            api_service = _read_msgpack(self.api_service_file)
         except Exception:
             return False
+        pid = api_service.get("pid")
+        return api_service.get("port") == port and bool(pid) and psutil.pid_exists(pid)
+
+    def _wait_for_port_available(self, host: str, port: int, timeout: float = 3.0) -> bool:
+        """Re-check a port with exponential backoff, giving a just-stopped server time to release it."""
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        with self._new_port_probe() as probe:
+            while True:
+                if self._check_port_availability(host, port, probe):
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.5)
         
     def start(self, configs: List[dict], port: int = 8080, host: str = "0.0.0.0") -> bool:
         """
@@ -84,11 +262,17 @@ class EternalZooManager:
             bool: True if service started successfully, False otherwise.
         """
 
-        if not self._check_port_availability(host, port):
+        if self._check_port_availability(host, port):
+            # stop the service if it is already running
+            self.stop()
+        elif self._is_own_api_port(port):
+            # Our previous API server holds the port: stop it, then give the kernel a moment to release it
+            self.stop()
+            if not self._wait_for_port_available(host, port):
+                raise ServiceStartError(f"Port {port} is already in use on {host}")
+        else:
+            # Held by something else; fail before tearing down the running service
             raise ServiceStartError(f"Port {port} is already in use on {host}")
-        
-        # stop the service if it is already running
-        self.stop()
 
         ai_services = []
         api_service = {
@@ -102,8 +286,6 @@ class EternalZooManager:
             running_ai_command = None
             ai_service = config.copy()
 
-            local_model_port = self._get_free_port()    
-
             if task == "embed":
                 logger.info(f"Starting embed model: {config}")
                 running_ai_command = self._build_embed_command(config)
@@ -125,17 +307,19 @@ class EternalZooManager:
                 raise ValueError(f"Invalid running AI command: {running_ai_command}")
             
             ai_service["running_ai_command"] = running_ai_command
-            logger.info(f"Running command: {' '.join(running_ai_command)}")
+            logger.opt(lazy=True).info("Running command: {}", lambda: " ".join(running_ai_command))
 
             if not config.get("on_demand", False):
                 try:
-                    # append port and host to the running_ai_command
-                    running_ai_command.extend(["--port", str(local_model_port), "--host", host])
+                    # Pick the port right before spawning to keep the window for another process to take it small
+                    local_model_port = self._get_free_port()
+                    # The stored command stays port-free so switch_model can relaunch it on any port
+                    launch_command = [*running_ai_command, "--port", str(local_model_port), "--host", host]
                     with open(self.ai_log_file, 'w') as stderr_log:
                         ai_process = subprocess.Popen(
-                            running_ai_command,
+                            launch_command,
                             stderr=stderr_log,
-                            preexec_fn=os.setsid
+                            start_new_session=True
                         )
                         logger.info(f"AI logs written to {self.ai_log_file}")
                     ai_service["created"] = int(time.time())
@@ -145,10 +329,9 @@ class EternalZooManager:
                     ai_service["port"] = local_model_port
                     ai_service["host"] = host
                     ai_services.append(ai_service)
-                    with open(self.ai_service_file, 'wb') as f:
-                        msgpack.pack(ai_services, f)
+                    _write_msgpack(self.ai_service_file, ai_services)
                     logger.info(f"AI service metadata written to {self.ai_service_file}")
-                    if not wait_for_health(local_model_port):
+                    if not wait_for_health(local_model_port, process=ai_process):
                         self.stop()
                         logger.error(f"Service failed to start within 120 seconds")
                         return False
@@ -156,16 +339,15 @@ class EternalZooManager:
                     self.stop()
                     logger.error(f"Error starting EternalZoo service: {str(e)}", exc_info=True)
                     return False
+                logger.info(f"[ETERNALZOO] Model service started on port {local_model_port}")
             else:
                 ai_service["created"] = int(time.time())
                 ai_service["owned_by"] = "user"
                 ai_service["active"] = False
                 ai_services.append(ai_service)
-                with open(self.ai_service_file, 'wb') as f:
-                    msgpack.pack(ai_services, f)
+                _write_msgpack(self.ai_service_file, ai_services)
                 logger.info(f"AI service metadata written to {self.ai_service_file}")
-                
-            logger.info(f"[ETERNALZOO] Model service started on port {local_model_port}")
+                logger.info("[ETERNALZOO] Model service registered to start on demand")
        
         # Start the FastAPI app
         uvicorn_command = [
@@ -176,22 +358,21 @@ class EternalZooManager:
             "--log-level", "info"
         ]
 
-        logger.info(f"Starting API process: {' '.join(uvicorn_command)}")
+        logger.opt(lazy=True).info("Starting API process: {}", lambda: " ".join(uvicorn_command))
 
         try:
             with open(self.api_log_file, 'w') as stderr_log:
                 api_process = subprocess.Popen(
                     uvicorn_command,
                     stderr=stderr_log,
-                    preexec_fn=os.setsid
+                    start_new_session=True
                 )
 
                 api_service["pid"] = api_process.pid
 
                 logger.info(f"API logs written to {self.api_log_file}")
 
-            with open(self.api_service_file, 'wb') as f:
-                msgpack.pack(api_service, f)
+            _write_msgpack(self.api_service_file, api_service)
 
             logger.info(f"API service metadata written to {self.api_service_file}")
             
@@ -213,43 +394,58 @@ class EternalZooManager:
             logger.warning("No running EternalZoo service to stop.")
             return False
         
-        if self.service_info_file.exists():
-            os.remove(self.service_info_file)
+        try:
+            os.unlink(self.service_info_file)
             logger.info(f"Service info file removed: {self.service_info_file}")
+        except FileNotFoundError:
+            logger.debug("Service info file already removed")
         
-        # always force kill the service
-        ai_services = []
-        ai_service_stop = False
-        api_service_stop = False
-        
-        if self.ai_service_file.exists():
-            with open(self.ai_service_file, 'rb') as f:
-                ai_services = msgpack.unpack(f)
-            for ai_service in ai_services:
-                pid = ai_service.get("pid", None)
-                if pid and psutil.pid_exists(pid):
-                    ai_service_stop = self._terminate_process_safely(pid, "EternalZoo AI Service", force=True)
-            
-            if ai_service_stop:
-                os.remove(self.ai_service_file)
-                logger.info(f"AI service metadata file removed: {self.ai_service_file}")
-            else:
-                logger.warning("Failed to stop EternalZoo AI Service")
+        # always force kill the service; the AI and API processes are independent,
+        # so their termination waits run side by side instead of back to back
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(self._stop_ai_services),
+                executor.submit(self._stop_api_service),
+            ]
+            for future in futures:
+                future.result()
         
-        if self.api_service_file.exists():
-            with open(self.api_service_file, 'rb') as f:
-                api_service = msgpack.unpack(f)
-            pid = api_service.get("pid", None)
+        return True
+
+    def _stop_ai_services(self) -> None:
+        """Force stop the AI services and remove their metadata file."""
+        if not self.ai_service_file.exists():
+            return
+
+        ai_service_stop = False
+        ai_services = _read_msgpack(self.ai_service_file)
+        for ai_service in ai_services:
+            pid = ai_service.get("pid", None)
             if pid and psutil.pid_exists(pid):
-                api_service_stop = self._terminate_process_safely(pid, "EternalZoo API Service", force=True)
-            
-            if api_service_stop:
-                os.remove(self.api_service_file)
-                logger.info(f"API service metadata file removed: {self.api_service_file}")
-            else:
-                logger.warning("Failed to stop EternalZoo API Service")
+                ai_service_stop = self._terminate_process_safely(pid, "EternalZoo AI Service", force=True)
         
-        return True
+        if ai_service_stop:
+            os.remove(self.ai_service_file)
+            logger.info(f"AI service metadata file removed: {self.ai_service_file}")
+        else:
+            logger.warning("Failed to stop EternalZoo AI Service")
+
+    def _stop_api_service(self) -> None:
+        """Force stop the API service and remove its metadata file."""
+        if not self.api_service_file.exists():
+            return
+
+        api_service_stop = False
+        api_service = _read_msgpack(self.api_service_file)
+        pid = api_service.get("pid", None)
+        if pid and psutil.pid_exists(pid):
+            api_service_stop = self._terminate_process_safely(pid, "EternalZoo API Service", force=True)
+        
+        if api_service_stop:
+            os.remove(self.api_service_file)
+            logger.info(f"API service metadata file removed: {self.api_service_file}")
+        else:
+            logger.warning("Failed to stop EternalZoo API Service")
 
     def _terminate_process_safely(self, pid: int, process_name: str, timeout: int = 15, use_process_group: bool = True, force: bool = False) -> bool:
         """
@@ -345,21 +541,10 @@ class EternalZooManager:
                     logger.info(f"Process {process_name} disappeared during termination")
                     return True
                 
-                # Wait for graceful termination with exponential backoff
-                wait_time = 0.1
-                elapsed = 0
-                while elapsed < timeout and psutil.pid_exists(pid):
-                    time.sleep(wait_time)
-                    elapsed += wait_time
-                    wait_time = min(wait_time * 1.5, 2.0)  # Cap at 2 seconds
-                    
-                    # Check if process became zombie
-                    try:
-                        if process.status() == psutil.STATUS_ZOMBIE:
-                            logger.info(f"{process_name} became zombie, considering stopped")
-                            return True
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        return True
+                # Wait for graceful termination
+                if _wait_for_pid_exit(pid, timeout):
+                    logger.info(f"{process_name} terminated successfully")
+                    return True
             else:
                 logger.info(f"Force mode enabled - skipping graceful termination for {process_name} (PID: {pid})")
             
@@ -408,12 +593,12 @@ class EternalZooManager:
                     logger.info(f"Process {process_name} disappeared during force kill")
                     return True
                 
-                # Final wait for force termination (shorter timeout)
-                force_timeout = 5
-                for _ in range(force_timeout * 10):  # 0.1s intervals
-                    if not psutil.pid_exists(pid):
-                        break
-                    time.sleep(0.1)
+                # Final wait for force termination (shorter timeout). The children were killed
+                # too, so wait for them as well; they may still hold ports or GPU memory
+                deadline = time.monotonic() + 5
+                _wait_for_pid_exit(pid, 5)
+                if children:
+                    psutil.wait_procs(children, timeout=max(deadline - time.monotonic(), 0))
             
             # Final status check
             success = not psutil.pid_exists(pid)
@@ -440,6 +625,27 @@ class EternalZooManager:
             logger.error(f"Error terminating {process_name} (PID: {pid}): {e}")
             return False
 
+    def _kill_owned_process(self, process: subprocess.Popen, process_name: str, timeout: float = 5) -> bool:
+        """
+        Force kill a process this manager spawned and reap it.
+
+        Unlike _terminate_process_safely, which only has a PID, the Popen handle lets us
+        block in waitpid until the exit instead of polling, and it leaves no zombie behind.
+        """
+        if process.poll() is None:
+            try:
+                # Started with start_new_session, so its process group id is its pid
+                os.killpg(process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                process.kill()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.error(f"Failed to terminate {process_name} (PID: {process.pid})")
+            return False
+        logger.info(f"{process_name} terminated successfully")
+        return True
+
     async def _terminate_process_safely_async(self, pid: int, process_name: str, timeout: int = 15, use_process_group: bool = True) -> bool:
         """
         Async version of _terminate_process_safely for use in async contexts.
@@ -519,12 +725,15 @@ class EternalZooManager:
                 logger.info(f"Process {process_name} disappeared during termination")
                 return True
             
-            # Wait for graceful termination with async sleep
+            # Wait for graceful termination against a fixed deadline, so neither the
+            # status checks nor the last backoff step can push past the timeout
+            deadline = time.monotonic() + timeout
             wait_time = 0.1
-            elapsed = 0
-            while elapsed < timeout and psutil.pid_exists(pid):
-                await asyncio.sleep(wait_time)
-                elapsed += wait_time
+            while psutil.pid_exists(pid):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(min(wait_time, remaining))
                 wait_time = min(wait_time * 1.5, 2.0)  # Cap at 2 seconds
                 
                 # Check if process became zombie
@@ -581,10 +790,8 @@ class EternalZooManager:
                     return True
                 
                 # Final wait for force termination with async sleep
-                force_timeout = 5
-                for _ in range(force_timeout * 10):  # 0.1s intervals
-                    if not psutil.pid_exists(pid):
-                        break
+                deadline = time.monotonic() + 5
+                while psutil.pid_exists(pid) and time.monotonic() < deadline:
                     await asyncio.sleep(0.1)
             
             # Final status check
@@ -630,8 +837,7 @@ class EternalZooManager:
             if not force:
                 # Verify that processes are actually stopped before cleanup
                 try:
-                    with open(self.msgpack_file, "rb") as f:
-                        service_info = msgpack.load(f)
+                    service_info = _read_msgpack(self.msgpack_file)
                     
                     pid = service_info.get("pid")
                     app_pid = service_info.get("app_pid")
@@ -671,59 +877,25 @@ class EternalZooManager:
             return False
 
     def _get_model_template_path(self, model_family: str | None = None) -> str:
-        if model_family is None:
-            return None
         """Get the template path for a specific model family."""
-        chat_template_path = pkg_resources.resource_filename("eternal_zoo", f"examples/templates/{model_family}.jinja")
-        # check if the template file exists
-        if not os.path.exists(chat_template_path):
+        if model_family is None:
             return None
-        return chat_template_path
+        return _find_package_file(f"examples/templates/{model_family}.jinja")
 
     def _get_model_best_practice_path(self, model_family: str | None = None) -> str:
-        if model_family is None:
-            return None
         """Get the best practices for a specific model family."""
-        best_practice_path = pkg_resources.resource_filename("eternal_zoo", f"examples/best_practices/{model_family}.json")
-        # check if the best practices file exists
-        if not os.path.exists(best_practice_path):
+        if model_family is None:
             return None
-        return best_practice_path
+        return _find_package_file(f"examples/best_practices/{model_family}.json")
     
     def _get_model_family(self, model_name: str | None = None) -> str:
         if model_name is None:
             return None
         model_name = model_name.lower()
-
-        if "gpt-oss" in model_name:
-            return "gpt-oss"
-        if "jan-v1" in model_name:
-            return "jan-v1"
-        if "qwen3-coder" in model_name:
-            return "qwen3-coder"
-        if "qwen3" in model_name:
-            if "2507" in model_name:
-                return "qwen3-2507"
-            else:
-                return "qwen3"
-        if "qwen2.5" in model_name:
-            return "qwen2.5"
-        if "lfm2" in model_name:
-            return "lfm2"
-        if "openreasoning-nemotron" in model_name:
-            return "openreasoning-nemotron"
-        if "dolphin-3.0" in model_name:
-            return "dolphin-3.0"
-        if "dolphin-3.1" in model_name:
-            return "dolphin-3.1"
-        if "devstral-small" in model_name:
-            return "devstral-small"
-        if "gemma-3n" in model_name:
-            return "gemma-3n"
-        if "gemma-3" in model_name:
-            return "gemma-3"
-    
-        return None
+        return next(
+            (family for keywords, family in MODEL_FAMILY_PATTERNS if all(k in model_name for k in keywords)),
+            None
+        )
     
     async def kill_ai_server(self) -> bool:
         """Kill the AI server process if it's running (optimized async version)."""
@@ -733,8 +905,7 @@ class EternalZooManager:
                 return False
                 
             # Load service details from the msgpack file
-            with open(self.msgpack_file, "rb") as f:
-                service_info = msgpack.load(f)
+            service_info = _read_msgpack(self.msgpack_file)
                 
             pid = service_info.get("pid")
             if not pid:
@@ -752,8 +923,7 @@ class EternalZooManager:
                     # Remove PID from service info to indicate server is no longer running
                     service_info.pop("pid", None)
                     
-                    with open(self.msgpack_file, "wb") as f:
-                        msgpack.dump(service_info, f)
+                    _write_msgpack(self.msgpack_file, service_info)
                     
                     logger.info("AI server stopped successfully and service info cleaned up")
                 except Exception as e:
@@ -769,13 +939,22 @@ class EternalZooManager:
             return False
 
     def get_service_info(self) -> Dict[str, Any]:
-        """Get service info from msgpack file with error handling."""
-        if not os.path.exists(self.service_info_file):
+        """Get service info from msgpack file with error handling.
+
+        The file is only re-read when it changes; every call still unpacks a fresh
+        dict, since callers modify the result before writing it back.
+        """
+        try:
+            st = os.stat(self.service_info_file)
+        except FileNotFoundError:
             raise EternalZooServiceError("Service information not available")
         
         try:
-            with open(self.service_info_file, "rb") as f:
-                return msgpack.load(f)
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if self._service_info_cache is None or self._service_info_cache[0] != key:
+                with open(self.service_info_file, "rb") as f:
+                    self._service_info_cache = (key, f.read())
+            return msgpack.unpackb(self._service_info_cache[1])
         except Exception as e:
             raise EternalZooServiceError(f"Failed to load service info: {str(e)}")
     
@@ -783,15 +962,14 @@ class EternalZooManager:
         """Update service information in the msgpack file."""
         try:
             if os.path.exists(self.service_info_file):
-                with open(self.service_info_file, "rb") as f:
-                    service_info = msgpack.load(f)
+                service_info = _read_msgpack(self.service_info_file)
             else:
                 service_info = {}
             
             service_info.update(updates)
             
-            with open(self.service_info_file, "wb") as f:
-                msgpack.dump(service_info, f)
+            _write_msgpack(self.service_info_file, service_info)
+            self._service_info_cache = None
             
             return True
         except Exception as e:
@@ -824,46 +1002,25 @@ class EternalZooManager:
         hf_data = config.get("hf_data", None)
         model_name = config.get("model_name", None)
         model_family = self._get_model_family(model_name)
-        template_path = self._get_model_template_path(model_family)
-        best_practice_path = self._get_model_best_practice_path(model_family)
+        template_path, best_practice_path = self._get_family_template_and_practice(model_family)
         projector = config.get("projector", None)
         context_length = config.get("context_length", 32768)
         backend = config.get("backend", "gguf")
 
         if backend == "gguf":
+            if projector is not None and not os.path.exists(projector):
+                raise ValueError(f"Projector file not found: {projector}")
+
+            # Template and best practice paths are only returned when the packaged file exists
             command = [
                 self.llama_server_path,
                 "--model", str(model_path),
-                "--pooling", "mean",
-                "--no-webui",
-                "--no-context-shift",
-                "-fa",
-                "-ngl", "9999",
                 "-c", str(context_length),
-                "--embeddings",
-                "--jinja",
+                *LLAMA_CHAT_CONST_ARGS,
+                *(("--mmproj", str(projector)) if projector is not None else ()),
+                *(("--chat-template-file", template_path) if template_path is not None else ()),
+                *_best_practice_args(best_practice_path),
             ]
-
-            if projector is not None:
-                if os.path.exists(projector):
-                    command.extend(["--mmproj", str(projector)])
-                else:
-                    raise ValueError(f"Projector file not found: {projector}")
-            
-            if template_path is not None:
-                if os.path.exists(template_path):
-                    command.extend(["--chat-template-file", template_path])
-                else:
-                    raise ValueError(f"Template file not found: {template_path}")
-            
-            if best_practice_path is not None:
-                if os.path.exists(best_practice_path):
-                    with open(best_practice_path, "r") as f:
-                        best_practice = json.load(f)
-                        for key, value in best_practice.items():
-                            command.extend([f"--{key}", str(value)])
-                else:
-                    raise ValueError(f"Best practices file not found: {best_practice_path}")
         elif backend == "mlx-lm":
             command = [
                 "mlx-openai-server",
@@ -885,10 +1042,7 @@ class EternalZooManager:
         command = [
             self.llama_server_path,
             "--model", str(model_path),
-            "--embedding",
-            "--pooling", "mean",
-            "-ub", "4096",
-            "-ngl", "9999"
+            *LLAMA_EMBED_CONST_ARGS,
         ]
         return command
 
@@ -983,15 +1137,18 @@ class EternalZooManager:
             return False
 
         local_model_port = self._get_free_port()
-        # extend the running_ai_command with the port and host
-        running_ai_command.extend(["--port", str(local_model_port), "--host", host])
-        logger.info(f"Switching to model: {target_model_id} with command: {' '.join(running_ai_command)}")
+        # Build the launch argv without touching the stored command, so it doesn't grow on every switch
+        launch_command = [*running_ai_command, "--port", str(local_model_port), "--host", host]
+        logger.opt(lazy=True).info(
+            "Switching to model: {} with command: {}",
+            lambda: target_model_id,
+            lambda: " ".join(launch_command),
+        )
         with open(self.ai_log_file, 'w') as stderr_log:
-            # ex
             ai_process = subprocess.Popen(
-                running_ai_command,
+                launch_command,
                 stderr=stderr_log,
-                preexec_fn=os.setsid
+                start_new_session=True
             )
             target_ai_service["pid"] = ai_process.pid
             target_ai_service["active"] = True
@@ -999,17 +1156,15 @@ class EternalZooManager:
             target_ai_service["host"] = host
             ai_services[target_service_index] = target_ai_service
 
-        with open(self.ai_service_file, 'wb') as f:
-            msgpack.pack(ai_services, f)
+        _write_msgpack(self.ai_service_file, ai_services)
             
-        # wait for the service to be healthy
-        if not wait_for_health(local_model_port):
-            self._terminate_process_safely(ai_process.pid, "EternalZoo AI Service", force=True)
+        # wait for the service to be healthy without blocking the event loop serving API requests
+        if not await wait_for_health_async(local_model_port, process=ai_process):
+            await asyncio.to_thread(self._kill_owned_process, ai_process, "EternalZoo AI Service")
             logger.error(f"Failed to switch to model {target_model_id}")
             return False
         
-        with open(self.ai_service_file, 'wb') as f:
-            msgpack.pack(ai_services, f)
+        _write_msgpack(self.ai_service_file, ai_services)
         logger.info(f"AI service metadata written to {self.ai_service_file}")
 
         self.update_service_info({
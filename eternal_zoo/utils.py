@@ -1,17 +1,19 @@
 import os
+import json
+import mmap
 import shutil
 import hashlib
 import subprocess
-import shutil
 import tempfile
-import subprocess
 import asyncio
-import requests
 import time
-from typing import List
+from typing import List, TYPE_CHECKING
 from loguru import logger
 from pathlib import Path
 
+if TYPE_CHECKING:
+    import requests
+
 
 def find_gguf_files(directory):
     """Find all .gguf files in the given directory with proper error handling"""
@@ -133,13 +135,55 @@ def extract_zip(paths: List[Path]):
         if temp_tar.exists():
             temp_tar.unlink()
 
+MMAP_HASH_THRESHOLD = 256 * 1024 * 1024  # Files above this size are hashed through mmap
+MMAP_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
 def compute_file_hash(file_path: Path, hash_algo: str = "sha256") -> str:
-    """Compute the hash of a file."""
-    hash_func = getattr(hashlib, hash_algo)()
+    """Compute the hash of a file.
+
+    Uses hashlib.file_digest, which reads into a reusable buffer and hashes
+    with the GIL released through OpenSSL (SHA-NI / ARMv8 SHA2 when the CPU
+    supports them) instead of looping over small chunks in Python. Large
+    files such as GGUF models are mapped into memory and hashed in slices,
+    which skips the copy into a read buffer and lets the kernel read ahead.
+    """
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_func.update(chunk)
-    return hash_func.hexdigest()
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size < MMAP_HASH_THRESHOLD:
+            return hashlib.file_digest(f, hash_algo).hexdigest()
+
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        hash_func = hashlib.new(hash_algo)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                for offset in range(0, file_size, MMAP_HASH_BLOCK_SIZE):
+                    hash_func.update(view[offset:offset + MMAP_HASH_BLOCK_SIZE])
+            finally:
+                view.release()
+        return hash_func.hexdigest()
+
+
+def write_json_atomic(path, data) -> None:
+    """Write JSON via a temp file and os.replace, so readers never see a half-written file.
+
+    Each call gets its own temp file, so concurrent writers can't replace the target
+    with each other's partial data, and a failed write doesn't leave the temp file behind.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
 
 
 async def async_move(src: str, dst: str) -> None:
@@ -179,48 +223,117 @@ async def async_extract_zip(paths: list) -> None:
     loop = asyncio.get_event_loop()
     await loop.run_in_executor(None, extract_zip, paths)  # Assuming extract_zip is defined
 
-def wait_for_health(port: int, timeout: int = 120) -> bool:
+HEALTH_CHECK_MAX_WAIT = 2  # Cap on the delay between health probes in seconds
+
+_http_session = None
+
+def get_http_session() -> "requests.Session":
+    """Return the shared keep-alive session used for local HTTP calls."""
+    global _http_session
+    if _http_session is None:
+        # requests is only needed once a service is started, keep it off the CLI import path
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _http_session = session
+    return _http_session
+
+class _HealthWait:
+    """Deadline, backoff and logging shared by wait_for_health and wait_for_health_async."""
+
+    def __init__(self, port: int, timeout: int, process: subprocess.Popen | None):
+        self.url = f"http://127.0.0.1:{port}/health"
+        self.timeout = timeout
+        self.process = process
+        self.start_time = time.monotonic()
+        self.wait_time = 0.5  # Start with shorter wait time for faster startup detection
+        self.last_error = None
+        logger.info(f"Waiting for service health at {self.url} (timeout: {timeout}s)")
+
+    def keep_waiting(self) -> bool:
+        """Whether to probe again; False once the timeout passes or the service process has exited."""
+        if time.monotonic() - self.start_time >= self.timeout:
+            logger.error(f"Health check failed after {self.timeout}s. Last error: {self.last_error}")
+            return False
+        if self.process is not None and self.process.poll() is not None:
+            logger.error(f"Service process exited with code {self.process.returncode} before becoming healthy")
+            return False
+        return True
+
+    def is_healthy(self, response) -> bool:
+        """Check a requests or httpx response to the health endpoint."""
+        if response.status_code != 200:
+            return False
+        try:
+            if response.json().get("status") != "ok":
+                return False
+        except ValueError:
+            # If JSON parsing fails, just check status code
+            return False
+        elapsed = time.monotonic() - self.start_time
+        logger.info(f"Service healthy at {self.url} (took {elapsed:.1f}s)")
+        return True
+
+    def next_delay(self) -> float:
+        """Return how long to sleep before the next probe, logging progress along the way."""
+        # Log progress every 30 seconds to avoid spam
+        elapsed = time.monotonic() - self.start_time
+        if elapsed > 0 and int(elapsed) % 30 == 0:
+            logger.debug(f"Still waiting for health check... ({elapsed:.0f}s elapsed, last error: {self.last_error})")
+        delay = self.wait_time
+        # Exponential backoff, capped low so a ready service is noticed quickly
+        self.wait_time = min(self.wait_time * 1.5, HEALTH_CHECK_MAX_WAIT)
+        return delay
+
+def wait_for_health(port: int, timeout: int = 120, process: subprocess.Popen | None = None) -> bool:
     """
     Wait for the service to become healthy with optimized retry logic.
+    If the service's process is given, stop waiting as soon as it exits.
     """
-    health_check_url = f"http://localhost:{port}/health"
-    start_time = time.time()
-    wait_time = 0.5  # Start with shorter wait time for faster startup detection
-    last_error = None
-    
-    logger.info(f"Waiting for service health at {health_check_url} (timeout: {timeout}s)")
-    
-    while time.time() - start_time < timeout:
+    import requests
+
+    wait = _HealthWait(port, timeout, process)
+    # Reuse pooled keep-alive connections for every probe instead of reconnecting each time
+    session = get_http_session()
+    while wait.keep_waiting():
         try:
             # Use shorter timeout for faster failure detection
-            response = requests.get(health_check_url, timeout=3)
-            if response.status_code == 200:
-                try:
-                    response_data = response.json()
-                    if response_data.get("status") == "ok":
-                        elapsed = time.time() - start_time
-                        logger.info(f"Service healthy at {health_check_url} (took {elapsed:.1f}s)")
-                        return True
-                except ValueError:
-                    # If JSON parsing fails, just check status code
-                    pass
-                    
+            if wait.is_healthy(session.get(wait.url, timeout=3)):
+                return True
         except requests.exceptions.ConnectionError:
-            last_error = "Connection refused"
+            wait.last_error = "Connection refused"
         except requests.exceptions.Timeout:
-            last_error = "Request timeout"
+            wait.last_error = "Request timeout"
         except requests.exceptions.RequestException as e:
-            last_error = str(e)[:100]
-        
-        # Log progress every 30 seconds to avoid spam
-        elapsed = time.time() - start_time
-        if elapsed > 0 and int(elapsed) % 30 == 0:
-            logger.debug(f"Still waiting for health check... ({elapsed:.0f}s elapsed, last error: {last_error})")
-        
-        time.sleep(wait_time)
-        # Exponential backoff with cap at 10 seconds
-        wait_time = min(wait_time * 1.5, 10)
-    
-    logger.error(f"Health check failed after {timeout}s. Last error: {last_error}")
+            wait.last_error = str(e)[:100]
+
+        time.sleep(wait.next_delay())
+    return False
+
+
+async def wait_for_health_async(port: int, timeout: int = 120, process: subprocess.Popen | None = None) -> bool:
+    """
+    Async variant of wait_for_health for callers already running on the event loop.
+    """
+    # httpx is what the API server already uses for its client, so this adds no import there
+    import httpx
+
+    wait = _HealthWait(port, timeout, process)
+    async with httpx.AsyncClient(timeout=3) as client:
+        while wait.keep_waiting():
+            try:
+                if wait.is_healthy(await client.get(wait.url)):
+                    return True
+            except httpx.ConnectError:
+                wait.last_error = "Connection refused"
+            except httpx.TimeoutException:
+                wait.last_error = "Request timeout"
+            except httpx.HTTPError as e:
+                wait.last_error = str(e)[:100]
+
+            await asyncio.sleep(wait.next_delay())
     return False
-    
@@ -31,7 +31,6 @@ setup(
         "fastapi==0.115.14",
         "uvicorn==0.35.0",
         "aiohttp==3.12.13",
-        "setuptools==80.9.0",
         "pydantic==2.11.7",
         "asyncio==3.4.3",
         "json_repair==0.47.6",